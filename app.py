@@ -1,10 +1,20 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import gspread
 from google.oauth2.service_account import Credentials
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 from datetime import datetime
+import hashlib
 import json
+import os
+import tempfile
+import threading
+import time
 
 # 페이지 설정
 st.set_page_config(
@@ -36,33 +46,277 @@ def get_google_sheets_client():
         st.error(f"Google Sheets 연결 오류: {e}")
         return None
 
+# 로컬 스냅샷 (콜드 스타트 시 Google Sheets 대기 없이 바로 표시)
+SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), 'jubo_snapshot.parquet')
+SNAPSHOT_META_KEY = b'jubo_sync'  # parquet 스키마 메타데이터 키 (동기화 정보)
+SNAPSHOT_TTL = 300  # 초
+_refresh_lock = threading.Lock()  # 스냅샷 갱신/삭제는 한 번에 하나만
+
+# 앱에서 사용하는 컬럼 (나머지 시트 컬럼은 버림)
+DATA_COLUMNS = ['날짜', '카테고리', '제목', '내용']
+
+def build_dataframe(header, rows):
+    """시트의 2차원 리스트를 데이터프레임으로 변환 (사용 컬럼만 유지)"""
+    # Sheets API는 행 끝의 빈 칸을 생략하므로 헤더 길이에 맞춰 채우거나 자름
+    width = len(header)
+    rows = [(row + [''] * (width - len(row)))[:width] for row in rows]
+    
+    df = pd.DataFrame(rows, columns=header)
+    df = df[[col for col in DATA_COLUMNS if col in df.columns]].copy()
+    
+    # 날짜 컬럼 변환 (같은 주일 날짜가 반복되므로 cache=True)
+    if '날짜' in df.columns:
+        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce', cache=True)
+    
+    # 텍스트 컬럼은 추론된 타입과 관계없이 문자열로 통일 (parquet 저장용, 빈 칸은 '')
+    # (숫자만 있는 증분 행이 int로 추론되면 기존 스냅샷과 합칠 때 타입이 섞임)
+    for col in ('카테고리', '제목', '내용'):
+        if col in df.columns:
+            df[col] = df[col].astype('string').fillna('')
+    
+    return df
+
+def is_same_row(a, b):
+    """두 데이터프레임의 첫 행 값이 같은지 비교 (dtype 차이는 무시)"""
+    if a.empty or b.empty or list(a.columns) != list(b.columns):
+        return False
+    return [str(v) for v in a.iloc[0].tolist()] == [str(v) for v in b.iloc[0].tolist()]
+
+def fetch_data_from_sheets():
+    """Google Sheets에서 데이터를 가져와 스냅샷으로 저장
+    
+    이전 스냅샷이 있으면 마지막으로 읽은 행부터 가져와, 그 행이 스냅샷의
+    마지막 행과 같을 때만 이후의 새 행을 이어 붙입니다. 다르면(행 삭제 등)
+    전체를 다시 읽습니다.
+    (중간 행 수정까지 반영하려면 사이드바의 새로고침 버튼으로 전체 로드)
+    """
+    client = get_google_sheets_client()
+    if not client:
+        return None
+    
+    # 시트 열기 (시트 URL 또는 이름)
+    sheet_url = st.secrets["sheet_url"]
+    spreadsheet = client.open_by_url(sheet_url)
+    worksheet = spreadsheet.sheet1
+    
+    cached_df, meta = load_snapshot()
+    df = None
+    
+    if cached_df is not None:
+        try:
+            # 증분 동기화: 마지막으로 읽은 행부터 요청 (첫 행은 확인용)
+            last_row = meta['last_row']
+            header = meta['header']
+            rows = worksheet.get(
+                f'A{last_row}:Z',
+                value_render_option='UNFORMATTED_VALUE',
+                date_time_render_option='FORMATTED_STRING'
+            )
+            
+            if rows and is_same_row(build_dataframe(header, rows[:1]), cached_df.tail(1)):
+                new_rows = rows[1:]
+                if not new_rows:
+                    # 변경 없음: 스냅샷 시각만 갱신
+                    os.utime(SNAPSHOT_PATH)
+                    return cached_df
+                
+                df = pd.concat(
+                    [cached_df, build_dataframe(header, new_rows)],
+                    ignore_index=True
+                )
+                last_row += len(new_rows)
+        except Exception:
+            # 증분 동기화에 실패하면 전체 로드로 대체
+            df = None
+    
+    if df is None:
+        # 전체 로드 (한 번의 API 호출로 2차원 리스트 수신)
+        raw = worksheet.get(
+            'A:Z',
+            value_render_option='UNFORMATTED_VALUE',
+            date_time_render_option='FORMATTED_STRING'
+        )
+        if not raw:
+            return pd.DataFrame()
+        
+        header, *rows = raw
+        df = build_dataframe(header, rows)
+        last_row = len(raw)
+    
+    save_snapshot(df, {'last_row': last_row, 'header': header})
+    return df
+
+def save_snapshot(df, meta):
+    """데이터프레임과 동기화 정보를 로컬 스냅샷으로 저장 (실패해도 무시)
+    
+    동기화 정보는 parquet 스키마 메타데이터에 함께 넣어
+    한 번의 os.replace로 데이터와 커서가 같이 바뀌도록 합니다.
+    """
+    tmp_path = None
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            SNAPSHOT_META_KEY: json.dumps(meta, ensure_ascii=False).encode('utf-8'),
+        })
+        
+        # 동시에 저장하는 스레드끼리 겹치지 않도록 임시 파일은 매번 새로 생성
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(SNAPSHOT_PATH), suffix='.parquet.tmp'
+        )
+        os.close(fd)
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, SNAPSHOT_PATH)
+    except Exception:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def load_snapshot():
+    """저장된 스냅샷과 동기화 정보 반환 (없으면 None, None)"""
+    try:
+        table = pq.read_table(SNAPSHOT_PATH)
+        meta = json.loads(table.schema.metadata[SNAPSHOT_META_KEY])
+        return table.to_pandas(), meta
+    except Exception:
+        return None, None
+
+def clear_snapshot():
+    """스냅샷 삭제 (다음 로드 시 전체 데이터를 다시 가져옴)"""
+    if os.path.exists(SNAPSHOT_PATH):
+        os.remove(SNAPSHOT_PATH)
+
+def load_fresh_snapshot():
+    """TTL 이내의 스냅샷이 있으면 반환, 없으면 None"""
+    try:
+        if os.path.getmtime(SNAPSHOT_PATH) > time.time() - SNAPSHOT_TTL:
+            return pd.read_parquet(SNAPSHOT_PATH)
+    except Exception:
+        pass
+    return None
+
+def refresh_snapshot_in_background():
+    """백그라운드 스레드에서 스냅샷 갱신 (동시에 하나만 실행)"""
+    def _refresh():
+        if not _refresh_lock.acquire(blocking=False):
+            return
+        try:
+            fetch_data_from_sheets()
+        except Exception:
+            pass
+        finally:
+            _refresh_lock.release()
+    
+    threading.Thread(target=_refresh, daemon=True).start()
+
+def add_date_columns(df):
+    """날짜 속성(연/월/주)을 작은 정수 컬럼으로 미리 계산
+    
+    Streamlit은 위젯 조작마다 스크립트 전체를 재실행하므로
+    .dt 접근자를 매번 호출하지 않도록 로드 시 한 번만 계산합니다.
+    (날짜가 없는 행은 0)
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df['날짜']):
+        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+    
+    dates = df['날짜'].dt
+    df['_year'] = dates.year.fillna(0).astype('int16')
+    df['_month'] = dates.month.fillna(0).astype('int8')
+    df['_week'] = dates.isocalendar().week.fillna(0).astype('int8')
+    
+    return df
+
 # 데이터 로드
 @st.cache_data(ttl=300)  # 5분 캐시
 def load_data_from_sheets():
-    """Google Sheets에서 데이터 로드"""
+    """Google Sheets에서 데이터 로드 (로컬 스냅샷 우선)"""
     try:
-        client = get_google_sheets_client()
-        if not client:
-            return None
-        
-        # 시트 열기 (시트 URL 또는 이름)
-        sheet_url = st.secrets["sheet_url"]
-        spreadsheet = client.open_by_url(sheet_url)
-        worksheet = spreadsheet.sheet1
-        
-        # 데이터 가져오기
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        
-        # 날짜 컬럼 변환
-        if '날짜' in df.columns:
-            df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+        # 최근 스냅샷이 있으면 바로 사용하고 시트는 백그라운드에서 갱신
+        df = load_fresh_snapshot()
+        if df is not None:
+            refresh_snapshot_in_background()
+        else:
+            # 진행 중인 백그라운드 갱신과 겹치지 않도록 같은 잠금 사용
+            with _refresh_lock:
+                df = fetch_data_from_sheets()
+        
+        if df is not None and '날짜' in df.columns:
+            # 최신순으로 한 번만 정렬 (검색 탭은 정렬 없이 앞에서부터 사용)
+            df = df.sort_values('날짜', ascending=False, kind='mergesort').reset_index(drop=True)
+            df = add_date_columns(df)
+        
+        # 검색용 소문자 문자열 (제목 + 구분자 + 내용) 미리 계산
+        if df is not None and {'제목', '내용'} <= set(df.columns):
+            df['_haystack'] = (
+                df['제목'].astype(str) + '\x1f' + df['내용'].fillna('').astype(str)
+            ).str.lower().astype('string[pyarrow]')
+        
+        # 반복 값이 많은 컬럼은 category 타입으로 (메모리 절약, groupby 가속)
+        if df is not None:
+            for col in ('카테고리', '제목'):
+                if col in df.columns:
+                    df[col] = df[col].astype('category')
+        
+        # 긴 본문은 pyarrow 문자열로 (파이썬 객체 오버헤드 제거)
+        if df is not None and '내용' in df.columns:
+            df['내용'] = df['내용'].astype('string[pyarrow]')
         
         return df
     except Exception as e:
         st.error(f"데이터 로드 오류: {e}")
         return None
 
+# API 키별 쿨다운 (할당량 초과 키는 일정 시간 건너뜀, 재시작해도 유지)
+KEY_COOLDOWN_PATH = os.path.join(tempfile.gettempdir(), 'jubo_gemini_cooldown.json')
+KEY_COOLDOWN_SECONDS = 60
+
+def get_key_id(api_key):
+    """디스크 저장용 키 식별자 (키 원문은 저장하지 않음)"""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+def load_key_cooldowns(api_keys):
+    """키별 쿨다운 종료 시각 목록 (저장된 값이 없으면 0)"""
+    try:
+        with open(KEY_COOLDOWN_PATH, encoding='utf-8') as f:
+            saved = json.load(f)
+    except Exception:
+        saved = {}
+    return [float(saved.get(get_key_id(key), 0.0)) for key in api_keys]
+
+def set_key_cooldown(index):
+    """할당량 초과 키에 쿨다운을 걸고 디스크에 저장"""
+    api_keys = st.session_state.get('api_keys', [])
+    cooldowns = st.session_state.setdefault('key_cooldown', [0.0] * len(api_keys))
+    now = time.time()
+    cooldowns[index] = now + KEY_COOLDOWN_SECONDS
+    
+    try:
+        saved = {
+            get_key_id(key): until
+            for key, until in zip(api_keys, cooldowns)
+            if until > now
+        }
+        with open(KEY_COOLDOWN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+    except Exception:
+        pass
+
+# 키별 Gemini 모델 (한 번만 생성하여 재사용)
+_configure_lock = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def get_model(api_key, model_name):
+    """API 키별 GenerativeModel 생성
+    
+    genai.configure는 프로세스 전역 설정이므로, 생성 직후 해당 키의
+    클라이언트를 모델에 고정하여 다른 세션의 설정 변경에 영향받지 않게 합니다.
+    (여러 세션이 동시에 다른 키로 만들 수 있으므로 설정~고정을 잠금으로 보호)
+    """
+    with _configure_lock:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name)
+        model._client = genai_client.get_default_generative_client()
+    return model
+
 # Gemini API 설정 - 여러 키 로테이션
 def init_gemini():
     """Gemini API 초기화 - 여러 키 순환 사용"""
@@ -84,14 +338,16 @@ def init_gemini():
         # 순환하며 작동하는 키 찾기
         for i, api_key in enumerate(api_keys):
             try:
-                genai.configure(api_key=api_key)
-                model = genai.GenerativeModel(model_name)
+                model = get_model(api_key, model_name)
                 
                 # 키가 작동하는지 간단히 테스트
                 # (실제 호출 시 오류 나면 다음 키로 전환)
-                st.session_state['current_api_key_index'] = i
+                # 키 목록이 그대로면 마지막으로 성공한 키부터 다시 사용
+                if st.session_state.get('api_keys') != api_keys:
+                    st.session_state['current_api_key_index'] = i
                 st.session_state['api_keys'] = api_keys
                 st.session_state['model_name'] = model_name
+                st.session_state['key_cooldown'] = load_key_cooldowns(api_keys)
                 
                 return model
                 
@@ -106,25 +362,44 @@ def init_gemini():
         st.error(f"Gemini API 초기화 오류: {e}")
         return None
 
-# Gemini API 호출 (재시도 로직 포함)
+# Gemini API 호출 (재시도 로직 포함, 스트리밍)
 def call_gemini_with_retry(prompt, generation_config):
-    """여러 API 키로 재시도하며 Gemini 호출"""
+    """여러 API 키로 재시도하며 Gemini 스트리밍 호출
+    
+    응답 텍스트 조각을 받는 즉시 yield 합니다. (st.write_stream용)
+    첫 조각을 받기 전에 할당량 오류가 나면 다음 키로 다시 시도합니다.
+    """
     api_keys = st.session_state.get('api_keys', [])
     model_name = st.session_state.get('model_name', 'gemini-3-flash-preview')
     start_index = st.session_state.get('current_api_key_index', 0)
-    
-    # 모든 키를 순환하며 시도
-    for attempt in range(len(api_keys)):
-        current_index = (start_index + attempt) % len(api_keys)
+    cooldowns = st.session_state.get('key_cooldown') or [0.0] * len(api_keys)
+    
+    # 쿨다운 중인 키는 건너뛰고 순환 순서대로 후보 선정
+    now = time.time()
+    candidates = [
+        index
+        for index in ((start_index + i) % len(api_keys) for i in range(len(api_keys)))
+        if cooldowns[index] < now
+    ]
+    if api_keys and not candidates:
+        yield "❌ 모든 API 키의 할당량이 초과되었습니다. 잠시 후 다시 시도해주세요."
+        return
+    
+    # 후보 키를 순환하며 시도
+    for attempt, current_index in enumerate(candidates):
         current_key = api_keys[current_index]
+        streamed = False
         
         try:
-            # API 키 설정
-            genai.configure(api_key=current_key)
-            model = genai.GenerativeModel(model_name)
+            # 키별로 캐시된 모델 사용
+            model = get_model(current_key, model_name)
             
-            # 실제 호출
-            response = model.generate_content(prompt, generation_config=generation_config)
+            # 실제 호출 (스트리밍)
+            response = model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                stream=True
+            )
             
             # 성공! 현재 인덱스 저장
             st.session_state['current_api_key_index'] = current_index
@@ -133,23 +408,53 @@ def call_gemini_with_retry(prompt, generation_config):
             if attempt > 0:
                 st.info(f"ℹ️ API 키 #{current_index + 1} 사용 중")
             
-            return response.text
+            for chunk in response:
+                streamed = True
+                yield chunk.text
+            return
             
         except Exception as e:
             error_msg = str(e)
             
+            # 이미 일부를 출력한 경우 재시도하지 않고 오류만 덧붙임
+            if streamed:
+                yield f"\n\n❌ 오류: {error_msg}"
+                return
+            
             # 할당량 초과 오류인 경우 다음 키 시도
             if "quota" in error_msg.lower() or "limit" in error_msg.lower():
-                if attempt < len(api_keys) - 1:
+                set_key_cooldown(current_index)
+                if attempt < len(candidates) - 1:
                     st.warning(f"⚠️ API 키 #{current_index + 1} 할당량 초과. 다음 키 시도 중...")
                     continue
                 else:
-                    return "❌ 모든 API 키의 할당량이 초과되었습니다. 내일 다시 시도해주세요."
+                    yield "❌ 모든 API 키의 할당량이 초과되었습니다. 잠시 후 다시 시도해주세요."
+                    return
             else:
                 # 다른 오류는 바로 반환
-                return f"❌ 오류: {error_msg}"
+                yield f"❌ 오류: {error_msg}"
+                return
     
-    return "❌ API 호출 실패"
+    yield "❌ API 호출 실패"
+
+# 캐시 키용 데이터프레임 요약 (전체 해시 대신 행 수와 최신 날짜만 사용)
+def dataframe_cache_key(df):
+    """새 데이터가 들어올 때만 바뀌는 가벼운 캐시 키"""
+    return (len(df), df['날짜'].max() if '날짜' in df.columns else None)
+
+# 연도별 데이터 분할 (데이터가 바뀔 때만 다시 계산)
+@st.cache_resource(
+    ttl=3600,
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: dataframe_cache_key}
+)
+def get_year_groups(df):
+    """연도별 데이터프레임 딕셔너리 {연도: 데이터} (날짜가 없는 행 제외)
+    
+    cache_resource로 복사 없이 공유하므로 반환된 데이터프레임은 수정하지 마세요.
+    """
+    dated = df[df['_year'] > 0]
+    return {int(year): year_df for year, year_df in dated.groupby('_year')}
 
 # 특정 주차 과거 기록 (지난주/이번주/다음주)
 def get_week_history(df, current_date=None, weeks_offset=0):
@@ -171,46 +476,62 @@ def get_week_history(df, current_date=None, weeks_offset=0):
     if '날짜' not in df.columns:
         return {}
     
-    # 날짜를 datetime으로 확실히 변환
-    df = df.copy()
-    df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
-    
-    # NaN 제거
-    df = df.dropna(subset=['날짜'])
-    
-    if df.empty:
-        return {}
+    # 날짜 속성 컬럼 확인
+    if '_year' not in df.columns:
+        df = add_date_columns(df.copy())
     
     # 오프셋 적용 (weeks_offset 주 전/후)
     from datetime import timedelta
     target_date = current_date + timedelta(weeks=weeks_offset)
     
     current_week = target_date.isocalendar()[1]
-    current_month = target_date.month
+    target_day = pd.Timestamp(target_date).normalize()
+    window = pd.Timedelta(days=7)
     
+    year_groups = get_year_groups(df)
     history = {}
     
-    # 최소 연도 계산 (int로 변환)
-    min_year = int(df['날짜'].dt.year.min())
-    
-    for year in range(min_year, current_date.year):
-        year_data = df[
-            (df['날짜'].dt.year == year) &
-            (
-                (df['날짜'].dt.isocalendar().week == current_week) |
-                (
-                    (df['날짜'].dt.month == current_month) &
-                    (df['날짜'].dt.day.between(target_date.day - 7, target_date.day + 7))
-                )
-            )
+    # 올해 이전 연도만: 그 해의 같은 주차 또는 같은 날짜 ±7일 이내
+    for year, year_df in year_groups.items():
+        if year >= current_date.year:
+            continue
+        
+        # 그 해의 같은 날짜 (2월 29일은 평년이면 2월 28일)
+        try:
+            anchor = target_day.replace(year=year)
+        except ValueError:
+            anchor = target_day.replace(year=year, day=28)
+        start, end = anchor - window, anchor + window
+        
+        # ±7일 범위가 연말/연초를 넘으면 이웃 연도 조각도 함께 검사
+        neighbors = [
+            year_groups[y] for y in {start.year, end.year} - {year}
+            if y in year_groups
         ]
+        candidates = pd.concat([year_df, *neighbors]) if neighbors else year_df
+        
+        dates = candidates['날짜'].to_numpy()
+        row_years = candidates['_year'].to_numpy()
+        week_match = candidates['_week'].to_numpy() == current_week
+        own_year = row_years == year
         
-        if not year_data.empty:
-            history[year] = year_data
+        # 이웃 연도의 행이 그 해의 같은 주차로 이미 잡히면 제외 (한 행은 한 연도에만)
+        claimed_elsewhere = ~own_year & week_match & (row_years < current_date.year)
+        
+        in_window = (dates >= start.to_datetime64()) & (dates <= end.to_datetime64())
+        mask = (own_year & week_match) | (in_window & ~claimed_elsewhere)
+        
+        if mask.any():
+            history[year] = candidates[mask]
     
     return history
 
 # 반복 이벤트 찾기
+@st.cache_data(
+    ttl=3600,
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: dataframe_cache_key}
+)
 def find_recurring_events(df, month):
     """특정 월의 반복 이벤트 찾기"""
     # 데이터 검증
@@ -220,17 +541,16 @@ def find_recurring_events(df, month):
     if '날짜' not in df.columns:
         return pd.DataFrame()
     
-    # 날짜가 datetime인지 확인
-    if not pd.api.types.is_datetime64_any_dtype(df['날짜']):
-        df = df.copy()
-        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+    # 날짜 속성 컬럼 확인
+    if '_month' not in df.columns:
+        df = add_date_columns(df.copy())
     
-    month_data = df[df['날짜'].dt.month == month].copy()
+    month_data = df[df['_month'] == month]
     
     if month_data.empty:
         return pd.DataFrame()
     
-    event_counts = month_data.groupby('제목').agg({
+    event_counts = month_data.groupby('제목', observed=True).agg({
         '날짜': 'count',
         '카테고리': 'first',
         '내용': 'first'
@@ -240,43 +560,44 @@ def find_recurring_events(df, month):
     
     return recurring
 
-# 다음 달 광고 추천
-def suggest_next_month_ads(df, target_month):
-    """Gemini API로 다음 달 광고 추천 (재시도 로직 포함)"""
+# 광고 추천 프롬프트 생성
+def build_prompt(df, target_month):
+    """과거 데이터로 광고 추천 프롬프트 생성
+    
+    Returns:
+        (prompt, error): 성공 시 (프롬프트, None), 실패 시 (None, 오류 메시지)
+    """
     # 데이터 검증
     if df is None or df.empty:
-        return "❌ 데이터가 없습니다."
+        return None, "❌ 데이터가 없습니다."
     
     if '날짜' not in df.columns:
-        return "❌ 날짜 컬럼이 없습니다."
+        return None, "❌ 날짜 컬럼이 없습니다."
     
-    # 날짜가 datetime인지 확인
-    if not pd.api.types.is_datetime64_any_dtype(df['날짜']):
-        df = df.copy()
-        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
-        df = df.dropna(subset=['날짜'])
+    # 날짜 속성 컬럼 확인
+    if '_month' not in df.columns:
+        df = add_date_columns(df.copy())
     
-    month_data = df[df['날짜'].dt.month == target_month].copy()
+    month_data = df[df['_month'] == target_month]
     
     if month_data.empty:
-        return f"❌ {target_month}월 데이터가 없습니다."
+        return None, f"❌ {target_month}월 데이터가 없습니다."
     
     recurring = find_recurring_events(df, target_month)
     
-    # 날짜를 문자열로 변환 (JSON 직렬화를 위해)
-    month_data['날짜'] = month_data['날짜'].dt.strftime('%Y-%m-%d')
-    
-    # 데이터 준비
-    past_events = month_data[['날짜', '카테고리', '제목', '내용']].head(50).to_dict('records')
-    recurring_events = recurring.head(20).reset_index().to_dict('records') if not recurring.empty else []
+    # 데이터 준비 (들여쓴 JSON보다 토큰이 적은 CSV 표 형식)
+    past_events = month_data[['날짜', '카테고리', '제목', '내용']].head(50).to_csv(
+        index=False, date_format='%Y-%m-%d'
+    )
+    recurring_events = recurring.head(20).reset_index().to_csv(index=False) if not recurring.empty else "없음"
     
     prompt = f"""다음은 성서교회의 과거 {target_month}월 주보 데이터입니다.
 
 **과거 {target_month}월 주요 이벤트 (최근 50개):**
-{json.dumps(past_events, ensure_ascii=False, indent=2)}
+{past_events}
 
 **{target_month}월에 3년 이상 반복되는 이벤트:**
-{json.dumps(recurring_events, ensure_ascii=False, indent=2)}
+{recurring_events}
 
 이 데이터를 바탕으로 올해 {target_month}월에 필요한 주보 광고를 추천해주세요.
 
@@ -291,15 +612,253 @@ def suggest_next_month_ads(df, target_month):
 ## 특별 고려사항
 - [교회 절기나 특별한 날]
 """
+    
+    return prompt, None
+
+# Gemini 응답 캐시 (세션 간 공유)
+GEMINI_CACHE_TTL = 86400  # 초 (하루)
+
+@st.cache_resource
+def get_gemini_response_cache():
+    """Gemini 응답 캐시 {(월, 프롬프트 해시, 모델명): (저장 시각, 응답)}"""
+    return {}
+
+def stream_and_cache(chunks, cache, cache_key):
+    """응답 조각을 그대로 전달하면서 모아 두었다가 성공 시 캐시에 저장"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    
+    # 오류 메시지는 항상 마지막 조각으로 오므로 이 경우 저장하지 않음
+    if parts and not parts[-1].lstrip().startswith("❌"):
+        cache[cache_key] = (time.time(), ''.join(parts))
 
+# 다음 달 광고 추천
+def suggest_next_month_ads(df, target_month):
+    """Gemini API로 다음 달 광고 추천 (재시도 로직 포함)
+    
+    같은 월·같은 데이터·같은 모델의 응답은 하루 동안 캐시하여
+    다시 생성해도 API 할당량을 쓰지 않습니다.
+    
+    오류나 캐시된 응답은 문자열, 새 응답은 텍스트 조각의 제너레이터를 반환합니다.
+    """
+    prompt, error = build_prompt(df, target_month)
+    if error:
+        return error
+    
+    # 캐시 키: 데이터프레임 대신 프롬프트 해시 사용
+    model_name = st.session_state.get('model_name', 'gemini-3-flash-preview')
+    prompt_hash = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+    cache_key = (target_month, prompt_hash, model_name)
+    
+    cache = get_gemini_response_cache()
+    cached = cache.get(cache_key)
+    if cached and time.time() - cached[0] < GEMINI_CACHE_TTL:
+        return cached[1]
+    
     # 새로운 재시도 로직 사용
-    return call_gemini_with_retry(
+    chunks = call_gemini_with_retry(
         prompt,
         generation_config=genai.GenerationConfig(
             temperature=0.3,
             max_output_tokens=2000,
         )
     )
+    return stream_and_cache(chunks, cache, cache_key)
+
+# 카테고리 아이콘 매핑
+CATEGORY_COLORS = {
+    '행사': '🎉', '교육': '📚', '예배': '🙏', 
+    '봉사': '🤝', '모임': '👥', '공지': '📢', '광고': '📣'
+}
+
+# 주차별 과거 기록 표시 (탭 1의 서브탭 공통)
+def render_week_history(df, current_date, weeks_offset, label):
+    """특정 주차의 연도별 과거 기록을 표로 표시"""
+    history = get_week_history(df, current_date, weeks_offset=weeks_offset)
+    
+    if not history:
+        st.warning(f"{label} 과거 기록이 없습니다.")
+        return
+    
+    for year in sorted(history.keys(), reverse=True):
+        with st.expander(f"📅 {year}년 {label} ({len(history[year])}개)", expanded=True):
+            year_df = history[year].sort_values('날짜').copy()
+            
+            # 표시용 데이터 준비
+            display_df = year_df[['날짜', '카테고리', '제목', '내용']].copy()
+            display_df['날짜'] = display_df['날짜'].dt.strftime('%m/%d')
+            
+            # 내용 축약 (행 단위 apply 대신 벡터 연산)
+            contents = display_df['내용'].fillna('').astype(str)
+            display_df['내용'] = contents.str.slice(0, 50) + np.where(
+                contents.str.len() > 50, '...', ''
+            )
+            
+            # 카테고리에 아이콘 추가 (행이 아니라 카테고리 값마다 한 번)
+            display_df['카테고리'] = display_df['카테고리'].cat.rename_categories(
+                lambda x: f"{CATEGORY_COLORS.get(x, '📌')} {x}"
+            )
+            
+            # 표로 표시
+            st.dataframe(
+                display_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "날짜": st.column_config.TextColumn("날짜", width="small"),
+                    "카테고리": st.column_config.TextColumn("카테고리", width="small"),
+                    "제목": st.column_config.TextColumn("제목", width="medium"),
+                    "내용": st.column_config.TextColumn("내용", width="large"),
+                }
+            )
+
+# 탭 1: 이번 주 과거 기록
+def render_history_tab(df):
+    """지난주/이번 주/다음 주 과거 기록 탭"""
+    st.header("📅 과거 기록 (3주)")
+    
+    current_date = datetime.now()
+    
+    # 주차 정보 계산
+    from datetime import timedelta
+    last_week_date = current_date - timedelta(weeks=1)
+    next_week_date = current_date + timedelta(weeks=1)
+    
+    # 3개 서브탭: 지난주, 이번주, 다음주
+    week_tab1, week_tab2, week_tab3 = st.tabs([
+        f"← 지난주 ({last_week_date.strftime('%m/%d')}주)",
+        f"⭐ 이번 주 ({current_date.strftime('%m/%d')}주)",
+        f"다음 주 → ({next_week_date.strftime('%m/%d')}주)"
+    ])
+    
+    # 서브탭 1: 지난주
+    with week_tab1:
+        st.info("💡 지난주에는 무엇을 준비했을까요?")
+        render_week_history(df, current_date, -1, "지난주")
+    
+    # 서브탭 2: 이번주
+    with week_tab2:
+        st.info("💡 올해 이번 주에는 무엇을 준비해야 할까요?")
+        render_week_history(df, current_date, 0, "이번 주")
+    
+    # 서브탭 3: 다음주
+    with week_tab3:
+        st.info("💡 다음 주를 미리 준비하세요!")
+        render_week_history(df, current_date, 1, "다음 주")
+
+# 탭 2: 다음 달 광고 추천
+# (fragment: 이 탭의 위젯을 조작하면 이 탭만 다시 실행)
+@st.fragment
+def render_suggestion_tab(df):
+    """Gemini 광고 추천 탭"""
+    st.header("🔮 다음 달 광고 추천")
+    st.info("💡 Gemini AI가 과거 패턴을 분석하여 추천합니다.")
+    
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        next_month = (datetime.now().month % 12) + 1
+        selected_month = st.selectbox(
+            "분석할 월 선택",
+            range(1, 13),
+            index=next_month - 1
+        )
+    
+    with col2:
+        if st.button("✨ AI 추천 생성", type="primary"):
+            with st.spinner("Gemini AI가 분석 중입니다..."):
+                # API 초기화 (키 로테이션 준비)
+                init_gemini()
+                
+                # AI 추천 생성 (받는 대로 바로 표시)
+                suggestion = suggest_next_month_ads(df, selected_month)
+                if isinstance(suggestion, str):
+                    st.markdown(suggestion)
+                else:
+                    st.write_stream(suggestion)
+
+# 탭 3: 월별 패턴 분석
+@st.fragment
+def render_pattern_tab(df):
+    """월별 반복 이벤트 분석 탭"""
+    st.header("📊 월별 패턴 분석")
+    
+    selected_month = st.selectbox(
+        "분석할 월 선택",
+        range(1, 13),
+        format_func=lambda x: f"{x}월"
+    )
+    
+    recurring = find_recurring_events(df, selected_month)
+    
+    if recurring.empty:
+        st.warning(f"{selected_month}월에 반복되는 이벤트가 없습니다.")
+    else:
+        st.subheader(f"{selected_month}월 반복 이벤트 (3년 이상)")
+        
+        # 데이터프레임 표시
+        display_df = recurring.reset_index()
+        display_df.columns = ['제목', '반복 횟수', '카테고리', '내용']
+        
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # 차트
+        st.bar_chart(recurring['횟수'])
+
+# 탭 4: 데이터 검색
+@st.fragment
+def render_search_tab(df):
+    """키워드/카테고리 검색 탭"""
+    st.header("🔍 데이터 검색")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        search_keyword = st.text_input("키워드 검색", placeholder="예: 양육훈련, 감사예배")
+    
+    with col2:
+        search_category = st.multiselect(
+            "카테고리 필터",
+            options=df['카테고리'].cat.categories.tolist()
+        )
+    
+    # 검색 실행 (조건을 불리언 마스크로 합친 뒤 한 번만 인덱싱, 전체 복사 없음)
+    mask = np.ones(len(df), dtype=bool)
+    
+    if search_keyword:
+        # pyarrow 문자열 커널로 한 번에 부분 문자열 검색 (_haystack은 이미 소문자)
+        matches = pc.match_substring(
+            pa.array(df['_haystack']),
+            search_keyword.lower()
+        )
+        mask &= matches.fill_null(False).to_numpy(zero_copy_only=False)
+    
+    if search_category:
+        mask &= df['카테고리'].isin(search_category).to_numpy()
+    
+    result_count = int(mask.sum())
+    st.subheader(f"검색 결과: {result_count}건")
+    
+    if result_count:
+        # 데이터는 로드 시 이미 최신순 정렬됨: 앞에서 50개만 꺼냄
+        top_df = df.iloc[np.flatnonzero(mask)[:50]]
+        
+        # 결과 표시 (행마다 Series를 만드는 iterrows 대신 컬럼 zip)
+        for date, title, category, content in zip(
+            top_df['날짜'], top_df['제목'], top_df['카테고리'], top_df['내용']
+        ):
+            with st.expander(f"{date.strftime('%Y-%m-%d')} - {title}"):
+                # 요소 하나로 묶어 전송 (결과당 st.markdown 한 번)
+                st.markdown(
+                    f"**카테고리**: {category}\n\n"
+                    f"**내용**: {content if pd.notna(content) else '없음'}"
+                )
 
 # 메인 앱
 def main():
@@ -312,7 +871,11 @@ def main():
         
         # 데이터 새로고침 버튼
         if st.button("🔄 데이터 새로고침"):
+            # 진행 중인 갱신이 끝난 뒤 삭제 (옛 데이터로 다시 덮어쓰지 않도록)
+            with _refresh_lock:
+                clear_snapshot()
             st.cache_data.clear()
+            get_year_groups.clear()
             st.rerun()
         
         st.markdown("---")
@@ -349,238 +912,19 @@ def main():
     
     # 탭 1: 이번 주 과거 기록
     with tab1:
-        st.header("📅 과거 기록 (3주)")
-        
-        current_date = datetime.now()
-        
-        # 주차 정보 계산
-        from datetime import timedelta
-        last_week_date = current_date - timedelta(weeks=1)
-        next_week_date = current_date + timedelta(weeks=1)
-        
-        # 3개 서브탭: 지난주, 이번주, 다음주
-        week_tab1, week_tab2, week_tab3 = st.tabs([
-            f"← 지난주 ({last_week_date.strftime('%m/%d')}주)",
-            f"⭐ 이번 주 ({current_date.strftime('%m/%d')}주)",
-            f"다음 주 → ({next_week_date.strftime('%m/%d')}주)"
-        ])
-        
-        # 카테고리 색상 매핑
-        category_colors = {
-            '행사': '🎉', '교육': '📚', '예배': '🙏', 
-            '봉사': '🤝', '모임': '👥', '공지': '📢', '광고': '📣'
-        }
-        
-        # 서브탭 1: 지난주
-        with week_tab1:
-            st.info("💡 지난주에는 무엇을 준비했을까요?")
-            history = get_week_history(df, current_date, weeks_offset=-1)
-            
-            if not history:
-                st.warning("지난주 과거 기록이 없습니다.")
-            else:
-                for year in sorted(history.keys(), reverse=True):
-                    with st.expander(f"📅 {year}년 지난주 ({len(history[year])}개)", expanded=True):
-                        year_df = history[year].sort_values('날짜').copy()
-                        
-                        # 표시용 데이터 준비
-                        display_df = year_df[['날짜', '카테고리', '제목', '내용']].copy()
-                        display_df['날짜'] = display_df['날짜'].dt.strftime('%m/%d')
-                        
-                        # 내용 축약
-                        display_df['내용'] = display_df['내용'].fillna('').astype(str).apply(
-                            lambda x: x[:50] + ('...' if len(x) > 50 else '')
-                        )
-                        
-                        # 카테고리에 아이콘 추가
-                        display_df['카테고리'] = display_df['카테고리'].apply(
-                            lambda x: f"{category_colors.get(x, '📌')} {x}"
-                        )
-                        
-                        # 표로 표시
-                        st.dataframe(
-                            display_df,
-                            use_container_width=True,
-                            hide_index=True,
-                            column_config={
-                                "날짜": st.column_config.TextColumn("날짜", width="small"),
-                                "카테고리": st.column_config.TextColumn("카테고리", width="small"),
-                                "제목": st.column_config.TextColumn("제목", width="medium"),
-                                "내용": st.column_config.TextColumn("내용", width="large"),
-                            }
-                        )
-        
-        # 서브탭 2: 이번주
-        with week_tab2:
-            st.info("💡 올해 이번 주에는 무엇을 준비해야 할까요?")
-            history = get_week_history(df, current_date, weeks_offset=0)
-            
-            if not history:
-                st.warning("이번 주 과거 기록이 없습니다.")
-            else:
-                for year in sorted(history.keys(), reverse=True):
-                    with st.expander(f"📅 {year}년 이번 주 ({len(history[year])}개)", expanded=True):
-                        year_df = history[year].sort_values('날짜').copy()
-                        
-                        # 표시용 데이터 준비
-                        display_df = year_df[['날짜', '카테고리', '제목', '내용']].copy()
-                        display_df['날짜'] = display_df['날짜'].dt.strftime('%m/%d')
-                        
-                        # 내용 축약
-                        display_df['내용'] = display_df['내용'].fillna('').astype(str).apply(
-                            lambda x: x[:50] + ('...' if len(x) > 50 else '')
-                        )
-                        
-                        # 카테고리에 아이콘 추가
-                        display_df['카테고리'] = display_df['카테고리'].apply(
-                            lambda x: f"{category_colors.get(x, '📌')} {x}"
-                        )
-                        
-                        # 표로 표시
-                        st.dataframe(
-                            display_df,
-                            use_container_width=True,
-                            hide_index=True,
-                            column_config={
-                                "날짜": st.column_config.TextColumn("날짜", width="small"),
-                                "카테고리": st.column_config.TextColumn("카테고리", width="small"),
-                                "제목": st.column_config.TextColumn("제목", width="medium"),
-                                "내용": st.column_config.TextColumn("내용", width="large"),
-                            }
-                        )
-        
-        # 서브탭 3: 다음주
-        with week_tab3:
-            st.info("💡 다음 주를 미리 준비하세요!")
-            history = get_week_history(df, current_date, weeks_offset=1)
-            
-            if not history:
-                st.warning("다음 주 과거 기록이 없습니다.")
-            else:
-                for year in sorted(history.keys(), reverse=True):
-                    with st.expander(f"📅 {year}년 다음 주 ({len(history[year])}개)", expanded=True):
-                        year_df = history[year].sort_values('날짜').copy()
-                        
-                        # 표시용 데이터 준비
-                        display_df = year_df[['날짜', '카테고리', '제목', '내용']].copy()
-                        display_df['날짜'] = display_df['날짜'].dt.strftime('%m/%d')
-                        
-                        # 내용 축약
-                        display_df['내용'] = display_df['내용'].fillna('').astype(str).apply(
-                            lambda x: x[:50] + ('...' if len(x) > 50 else '')
-                        )
-                        
-                        # 카테고리에 아이콘 추가
-                        display_df['카테고리'] = display_df['카테고리'].apply(
-                            lambda x: f"{category_colors.get(x, '📌')} {x}"
-                        )
-                        
-                        # 표로 표시
-                        st.dataframe(
-                            display_df,
-                            use_container_width=True,
-                            hide_index=True,
-                            column_config={
-                                "날짜": st.column_config.TextColumn("날짜", width="small"),
-                                "카테고리": st.column_config.TextColumn("카테고리", width="small"),
-                                "제목": st.column_config.TextColumn("제목", width="medium"),
-                                "내용": st.column_config.TextColumn("내용", width="large"),
-                            }
-                        )
+        render_history_tab(df)
     
     # 탭 2: 다음 달 광고 추천
     with tab2:
-        st.header("🔮 다음 달 광고 추천")
-        st.info("💡 Gemini AI가 과거 패턴을 분석하여 추천합니다.")
-        
-        col1, col2 = st.columns([1, 3])
-        
-        with col1:
-            next_month = (datetime.now().month % 12) + 1
-            selected_month = st.selectbox(
-                "분석할 월 선택",
-                range(1, 13),
-                index=next_month - 1
-            )
-        
-        with col2:
-            if st.button("✨ AI 추천 생성", type="primary"):
-                with st.spinner("Gemini AI가 분석 중입니다..."):
-                    # API 초기화 (키 로테이션 준비)
-                    init_gemini()
-                    
-                    # AI 추천 생성
-                    suggestion = suggest_next_month_ads(df, selected_month)
-                    st.markdown(suggestion)
+        render_suggestion_tab(df)
     
     # 탭 3: 월별 패턴 분석
     with tab3:
-        st.header("📊 월별 패턴 분석")
-        
-        selected_month = st.selectbox(
-            "분석할 월 선택",
-            range(1, 13),
-            format_func=lambda x: f"{x}월"
-        )
-        
-        recurring = find_recurring_events(df, selected_month)
-        
-        if recurring.empty:
-            st.warning(f"{selected_month}월에 반복되는 이벤트가 없습니다.")
-        else:
-            st.subheader(f"{selected_month}월 반복 이벤트 (3년 이상)")
-            
-            # 데이터프레임 표시
-            display_df = recurring.reset_index()
-            display_df.columns = ['제목', '반복 횟수', '카테고리', '내용']
-            
-            st.dataframe(
-                display_df,
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            # 차트
-            st.bar_chart(recurring['횟수'])
+        render_pattern_tab(df)
     
     # 탭 4: 데이터 검색
     with tab4:
-        st.header("🔍 데이터 검색")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            search_keyword = st.text_input("키워드 검색", placeholder="예: 양육훈련, 감사예배")
-        
-        with col2:
-            search_category = st.multiselect(
-                "카테고리 필터",
-                options=df['카테고리'].unique().tolist()
-            )
-        
-        # 검색 실행
-        filtered_df = df.copy()
-        
-        if search_keyword:
-            filtered_df = filtered_df[
-                filtered_df['제목'].str.contains(search_keyword, case=False, na=False) |
-                filtered_df['내용'].str.contains(search_keyword, case=False, na=False)
-            ]
-        
-        if search_category:
-            filtered_df = filtered_df[filtered_df['카테고리'].isin(search_category)]
-        
-        st.subheader(f"검색 결과: {len(filtered_df)}건")
-        
-        if not filtered_df.empty:
-            # 최신순 정렬
-            filtered_df = filtered_df.sort_values('날짜', ascending=False)
-            
-            # 결과 표시
-            for _, row in filtered_df.head(50).iterrows():
-                with st.expander(f"{row['날짜'].strftime('%Y-%m-%d')} - {row['제목']}"):
-                    st.markdown(f"**카테고리**: {row['카테고리']}")
-                    st.markdown(f"**내용**: {row['내용'] if pd.notna(row['내용']) else '없음'}")
+        render_search_tab(df)
 
 if __name__ == "__main__":
     main()